@@ -1,15 +1,25 @@
 import streamlit as st
 import math
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+import httplib2
 from datetime import datetime, timedelta, timezone
 from collections import Counter
+from heapq import nlargest
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 import re
+import os
+import hashlib
+import threading
 import time
+import random
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import orjson
 import numpy as np
 from wordcloud import WordCloud
 
@@ -21,150 +31,284 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- 폰트 로드 (프로젝트 폴더에 'font/malgun.ttf'가 있어야 함) ---
-try:
-    font_path = 'font/malgun.ttf'
-    fm.fontManager.addfont(font_path)
-    font_name = fm.FontProperties(fname=font_path).get_name()
-    plt.rcParams['font.family'] = font_name
-    plt.rcParams['axes.unicode_minus'] = False
-except Exception as e:
-    st.warning(f"폰트 설정 오류: {e}")
+# --- 폰트 확인 (프로젝트 폴더에 'font/malgun.ttf'가 있어야 함, 워드 클라우드에 사용) ---
+font_path = 'font/malgun.ttf'
+if not os.path.exists(font_path):
+    st.warning(f"폰트 설정 오류: '{font_path}' 파일을 찾을 수 없습니다.")
     st.info("프로젝트 폴더에 'font' 폴더를 만들고 'malgun.ttf' 파일을 추가해주세요.")
 
 
+# --- 키워드 추출용 정규식 및 불용어 (모듈 로드 시 한 번만 생성) ---
+_TOKEN_RE = re.compile(r'[\w#]+')
+_HANGUL_RUN_RE = re.compile(r'[가-힣]{2,}')
+_STOP_WORDS = frozenset(["영상", "추천", "비디오", "Youtube", "YouTube", "보기", "최신", "인기", "급상승", "공개", "풀영상", "풀버전", "공식"])
+
+def _iter_words(titles):
+    """제목을 한 번만 훑으며 해시태그와 한글 단어(한글 2자 이상 포함) 후보를 생성"""
+    for title in titles:
+        for match in _TOKEN_RE.finditer(title):
+            token = match.group()
+            if '#' in token:
+                yield from filter(None, token.split('#')[1:])
+            if _HANGUL_RUN_RE.search(token):
+                yield token
+
+
+# --- 확산 계수(SC) 스케일 상수 및 해석 구간 (구간 상한은 미포함) ---
+_SC_SCALE = 10.0 / (math.log10(5_000_000) - 3)
+_SC_BOUNDS = np.array([2.0, 4.0, 6.0, 8.0, 10.0])
+_SC_LABELS = ("미미한 영향", "주목 요망", "유의미한 영향", "심각한 영향", "위기 수준", "최고 위기 수준")
+
+
+# --- API 동시 요청 설정 ---
+API_MAX_WORKERS = 8  # YouTube/Naver 요청을 동시에 보낼 최대 스레드 수
+API_TIMEOUT = 10  # 요청당 타임아웃 (초)
+
+@st.cache_resource
+def _api_pool():
+    """API 요청용 스레드 풀 (리런 간에 워커 스레드와 커넥션을 유지)"""
+    return ThreadPoolExecutor(max_workers=API_MAX_WORKERS)
+
+@st.cache_resource
+def _http_local():
+    """워커 스레드별 httplib2.Http 저장소 (Http 객체는 스레드 안전하지 않음)"""
+    return threading.local()
+
+
+# --- YouTube API 재시도 헬퍼 ---
+def is_retryable_error(error):
+    """쿼터/속도 제한 또는 일시적인 서버 오류인지 확인"""
+    status = error.resp.status
+    if status == 403:
+        # 403은 쿼터/속도 제한일 때만 재시도 (commentsDisabled 등은 바로 실패)
+        reasons = (b'quotaExceeded', b'rateLimitExceeded', b'userRateLimitExceeded')
+        return any(reason in error.content for reason in reasons)
+    return status in (429, 500, 503)
+
+def call_with_backoff(request, attempts=5, http=None):
+    """API 요청 실행 (재시도 가능한 오류일 때만 지수 백오프 후 재시도)"""
+    for attempt in range(attempts):
+        try:
+            return request.execute(http=http)
+        except HttpError as e:
+            if attempt == attempts - 1 or not is_retryable_error(e):
+                raise
+            # 0.25초에서 시작해 두 배씩 대기 (동시 재시도가 몰리지 않도록 약간의 지터 추가)
+            time.sleep(0.25 * 2 ** attempt * (1 + 0.1 * random.random()))
+
+class PartialFetchError(Exception):
+    """일부 API 요청이 실패한 수집 결과
+
+    st.cache_data는 예외를 캐시하지 않으므로, 실패가 섞인 결과는 반환하지 않고
+    이 예외에 담아 전달해 다음 실행 때 다시 요청하도록 함
+    """
+    def __init__(self, result, errors):
+        super().__init__(f"API 요청 {len(errors)}건 실패")
+        self.result = result
+        self.errors = errors
+
+def _execute_with_thread_http(request, http_local):
+    """워커 스레드 전용 Http로 요청 실행 (같은 스레드의 다음 요청은 커넥션 재사용)"""
+    http = getattr(http_local, 'http', None)
+    if http is None:
+        http = http_local.http = httplib2.Http(timeout=API_TIMEOUT)
+    return call_with_backoff(request, http=http)
+
+def submit_api_requests(api_requests):
+    """YouTube API 요청들을 공용 스레드 풀에 제출하고 Future 목록 반환"""
+    pool, http_local = _api_pool(), _http_local()
+    return [pool.submit(_execute_with_thread_http, request, http_local) for request in api_requests]
+
+
+# --- YouTube 데이터 수집 (Streamlit 캐시) ---
+@st.cache_resource
+def _youtube_api_key():
+    """YouTube API 키 (secrets는 프로세스당 한 번만 조회)"""
+    return st.secrets["YOUTUBE_API_KEY"]
+
+@st.cache_resource
+def get_youtube_client(_api_key, api_key_digest):
+    """YouTube API 클라이언트를 키마다 한 번만 생성 (내장 discovery 문서 사용, 캐시 키는 키의 해시값)"""
+    return build('youtube', 'v3', developerKey=_api_key, cache_discovery=False, static_discovery=True)
+
+VIDEO_COLUMNS = ('id', 'title', 'channelTitle', 'publishedAt', 'viewCount', 'likeCount', 'commentCount')
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_videos(_api_key, api_key_digest, keyword, max_results, days_back):
+    """키워드로 비디오 검색 (페이지네이션 및 배치 처리, 동일 조건은 1시간 캐시)"""
+    youtube = get_youtube_client(_api_key, api_key_digest)
+    
+    # 검색은 전체 기간에서 조회수 순으로 페이지를 차례로 요청
+    # (다음 페이지는 이전 응답의 nextPageToken이 있어야 하므로 순차 실행)
+    published_after = (datetime.now(timezone.utc) - timedelta(days=days_back)).isoformat()
+    video_ids = {}
+    errors = []
+    next_page_token = None
+    while len(video_ids) < max_results:
+        search_request = youtube.search().list(
+            q=keyword,
+            part="id",
+            fields="nextPageToken,items(id/videoId)",
+            maxResults=min(50, max_results - len(video_ids)),
+            pageToken=next_page_token,
+            order="viewCount",
+            publishedAfter=published_after,
+            type="video",
+            relevanceLanguage="ko"
+        )
+        try:
+            search_response = submit_api_requests([search_request])[0].result()
+        except Exception as e:
+            errors.append(e)
+            break
+        
+        # type="video" 필터로 검색하므로 모든 항목이 동영상 (페이지 간 중복은 순서 유지하며 제거)
+        for item in search_response.get('items', []):
+            video_ids[item['id']['videoId']] = None
+        
+        next_page_token = search_response.get('nextPageToken')
+        if not next_page_token:
+            break
+    video_ids = list(video_ids)[:max_results]
+    
+    # 영상 정보는 열 단위 리스트로 모아 DataFrame으로 반환
+    columns = {name: [] for name in VIDEO_COLUMNS}
+    actual_count = len(video_ids)
+    if actual_count == 0:
+        if errors:
+            raise PartialFetchError(pd.DataFrame(columns), errors)
+        return pd.DataFrame(columns)
+    
+    def video_request(ids):
+        return youtube.videos().list(
+            part="statistics,snippet",
+            fields="items(id,statistics(viewCount,likeCount,commentCount),snippet(title,channelTitle,publishedAt))",
+            id=",".join(ids)
+        )
+    
+    # 50개 단위 조회 요청은 서로 독립적이므로 동시에 호출
+    batch_size = 50
+    futures = submit_api_requests([
+        video_request(video_ids[i:i + batch_size])
+        for i in range(0, actual_count, batch_size)
+    ])
+    for future in futures:
+        # 실패한 배치만 건너뛰고 나머지 배치 결과는 유지
+        try:
+            video_response = future.result()
+        except Exception as e:
+            errors.append(e)
+            continue
+        
+        for item in video_response.get('items', []):
+            columns['id'].append(item['id'])
+            columns['title'].append(item['snippet']['title'])
+            columns['channelTitle'].append(item['snippet']['channelTitle'])
+            columns['publishedAt'].append(item['snippet']['publishedAt'])
+            columns['viewCount'].append(int(item['statistics'].get('viewCount', 0)))
+            columns['likeCount'].append(int(item['statistics'].get('likeCount', 0)))
+            columns['commentCount'].append(int(item['statistics'].get('commentCount', 0)))
+    
+    for name in ('viewCount', 'likeCount', 'commentCount'):
+        columns[name] = np.array(columns[name], dtype=np.int64)
+    df_videos = pd.DataFrame(columns)
+    if errors:
+        raise PartialFetchError(df_videos, errors)
+    return df_videos
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_comments(_api_key, api_key_digest, video_ids, max_results_per_video):
+    """영상별 댓글과 좋아요 수 수집 (동일 영상 목록은 1시간 캐시)"""
+    youtube = get_youtube_client(_api_key, api_key_digest)
+    comment_requests = [
+        youtube.commentThreads().list(
+            part="snippet",
+            fields="items(snippet/topLevelComment/snippet(textDisplay,likeCount))",
+            videoId=video_id,
+            maxResults=max_results_per_video,
+            order="relevance"
+        )
+        for video_id in video_ids
+    ]
+    
+    all_comments = []
+    errors = []
+    futures = submit_api_requests(comment_requests)
+    for future in futures:
+        try:
+            comment_response = future.result()
+        except HttpError as e:
+            # 댓글 사용 중지(403) 등 영구 오류는 건너뛰고, 일시적인 오류만 실패로 기록
+            if is_retryable_error(e):
+                errors.append(e)
+            continue
+        except Exception as e:
+            errors.append(e)
+            continue
+            
+        for item in comment_response.get('items', []):
+            comment_info = item['snippet']['topLevelComment']['snippet']
+            comment_text = re.sub(r'<br\s*/>', ' ', comment_info['textDisplay'])
+                
+            all_comments.append({
+                'text': comment_text,
+                'likeCount': comment_info['likeCount']
+            })
+    
+    if errors:
+        raise PartialFetchError(all_comments, errors)
+    return all_comments
+
+
 # --- 1. YouTube 분석 클래스 ---
 class YouTubeSpreadAnalyzer:
     def __init__(self, api_key):
-        self.youtube = build('youtube', 'v3', developerKey=api_key)
         self.api_key = api_key
+        # 캐시 키에는 원본 API 키 대신 해시값만 사용
+        self.api_key_digest = hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
     
     def search_videos_by_keyword(self, keyword, max_results=100, days_back=30):
-        """키워드로 비디오 검색 (페이지네이션 및 배치 처리)"""
-        published_after = (datetime.now(timezone.utc) - timedelta(days=days_back)).isoformat()
-        video_ids = []
-        next_page_token = None
-        remaining_results = max_results
-        
-        while remaining_results > 0:
-            current_max = min(50, remaining_results)
-            try:
-                search_response = self.youtube.search().list(
-                    q=keyword,
-                    part="id,snippet",
-                    maxResults=current_max,
-                    pageToken=next_page_token,
-                    order="viewCount",
-                    publishedAfter=published_after,
-                    type="video",
-                    relevanceLanguage="ko"
-                ).execute()
-            except Exception as e:
-                st.error(f"YouTube API 호출 오류: {e}")
-                break
-
-            for item in search_response['items']:
-                if item['id']['kind'] == 'youtube#video':
-                    video_ids.append(item['id']['videoId'])
-            
-            next_page_token = search_response.get('nextPageToken')
-            if not next_page_token:
-                break
-            
-            remaining_results -= current_max
-            time.sleep(0.5)
-        
-        actual_count = len(video_ids)
-        if actual_count == 0:
-            return []
-        
-        videos = []
-        batch_size = 50
-        for i in range(0, actual_count, batch_size):
-            batch_ids = video_ids[i:i + batch_size]
-            try:
-                video_response = self.youtube.videos().list(
-                    part="statistics,snippet",
-                    id=",".join(batch_ids)
-                ).execute()
-            except Exception as e:
-                st.error(f"YouTube API 호출 오류: {e}")
-                break
-
-            for item in video_response['items']:
-                view_count = int(item['statistics'].get('viewCount', 0))
-                like_count = int(item['statistics'].get('likeCount', 0))
-                comment_count = int(item['statistics'].get('commentCount', 0))
-                
-                videos.append({
-                    'id': item['id'],
-                    'title': item['snippet']['title'],
-                    'channelTitle': item['snippet']['channelTitle'],
-                    'publishedAt': item['snippet']['publishedAt'],
-                    'viewCount': view_count,
-                    'likeCount': like_count,
-                    'commentCount': comment_count
-                })
-            
-            time.sleep(0.5)
-        
-        return videos
+        """키워드로 비디오 검색 (캐시된 _fetch_videos 호출, 일부 실패 시 오류 표시 후 부분 결과 사용)"""
+        try:
+            return _fetch_videos(self.api_key, self.api_key_digest, keyword, max_results, days_back)
+        except PartialFetchError as e:
+            for error in e.errors:
+                st.error(f"YouTube API 호출 오류: {error}")
+            return e.result
     
     def get_video_comments_with_likes(self, video_ids, max_results_per_video=30):
         """댓글을 가져와 좋아요 순으로 정렬하여 리스트 반환"""
-        all_comments = []
-        for video_id in video_ids:
-            try:
-                comment_response = self.youtube.commentThreads().list(
-                    part="snippet",
-                    videoId=video_id,
-                    maxResults=max_results_per_video,
-                    order="relevance"
-                ).execute()
-                
-                for item in comment_response['items']:
-                    comment_info = item['snippet']['topLevelComment']['snippet']
-                    comment_text = re.sub(r'<br\s*/>', ' ', comment_info['textDisplay'])
-                    
-                    all_comments.append({
-                        'text': comment_text,
-                        'likeCount': comment_info['likeCount']
-                    })
-            except Exception as e:
-                continue
-                
-        return all_comments
+        try:
+            return _fetch_comments(self.api_key, self.api_key_digest, tuple(video_ids), max_results_per_video)
+        except PartialFetchError as e:
+            # 영상마다 같은 오류가 반복되므로 첫 오류만 요약해서 표시
+            st.error(f"YouTube 댓글 API 호출 오류 ({len(e.errors)}건): {e.errors[0]}")
+            return e.result
     
-    def calculate_spread_coefficient(self, videos):
-        if not videos:
+    def calculate_spread_coefficient(self, df_videos):
+        if df_videos.empty:
             return 0.0, 0.0, 0, 0.0
         
-        total_views = 0
-        total_weighted = 0
-        video_count = len(videos)
+        views = df_videos['viewCount'].to_numpy()
+        likes = df_videos['likeCount'].to_numpy()
+        comments = df_videos['commentCount'].to_numpy()
         
-        for video in videos:
-            view_count = video['viewCount']
-            like_count = video['likeCount']
-            comment_count = video['commentCount']
-            
-            engagement = 0
-            if view_count > 0:
-                engagement = min(0.45, (like_count + comment_count) / view_count)
-            
-            weighted_views = view_count * (1 + engagement)
-            total_weighted += weighted_views
-            total_views += view_count
+        # 조회수 0인 영상은 가중 조회수도 0이므로 분모만 1로 보정
+        # (좋아요+댓글 합은 uint32 오버플로를 피하도록 float64로 계산)
+        engagement = np.minimum(0.45, np.add(likes, comments, dtype=np.float64) / np.maximum(views, 1))
+        weighted_views = views * (1.0 + engagement)
         
-        avg_views = total_views / video_count
-        avg_weighted = total_weighted / video_count
+        total_views = int(views.sum())
+        avg_views = total_views / len(views)
+        avg_weighted = float(weighted_views.mean())
         
         if avg_weighted <= 1000:
             spread_coefficient = 0
         elif avg_weighted >= 5_000_000:
             spread_coefficient = 10.0
         else:
-            spread_coefficient = (math.log10(avg_weighted) - 3) * (10 / (math.log10(5_000_000) - 3))
+            spread_coefficient = (math.log10(avg_weighted) - 3) * _SC_SCALE
         
         return spread_coefficient, avg_weighted, total_views, avg_views
     
@@ -172,35 +316,33 @@ class YouTubeSpreadAnalyzer:
         if not titles:
             return []
         
-        stop_words = ["영상", "추천", "비디오", "Youtube", "YouTube", "보기", "최신", "인기", "급상승", "공개", "풀영상", "풀버전", "공식"]
-        words = []
-        for title in titles:
-            clean_title = re.sub(r'[^\w\s#]', '', title)
-            hashtags = re.findall(r'#(\w+)', clean_title)
-            words.extend(hashtags)
-            korean_words = re.findall(r'[\w#]*[가-힣]{2,}[\w#]*', clean_title)
-            words.extend(korean_words)
-        
-        filtered_words = [word for word in words if word not in stop_words and len(word) > 1]
-        word_counts = Counter(filtered_words)
+        word_counts = Counter(
+            word for word in _iter_words(titles)
+            if len(word) > 1 and word not in _STOP_WORDS
+        )
         
         return [f"#{word}" for word, _ in word_counts.most_common(top_n)]
     
     def analyze_keyword_spread(self, keyword, days_back=30, max_results=100):
-        videos = self.search_videos_by_keyword(keyword, max_results, days_back)
+        df_videos = self.search_videos_by_keyword(keyword, max_results, days_back)
         
-        if not videos:
+        if df_videos.empty:
             return {"error": "동영상을 찾을 수 없습니다"}, None
         
-        spread_coeff, avg_weighted, total_views, avg_views = self.calculate_spread_coefficient(videos)
+        # 카운트 열은 uint32 범위면 다운캐스트 (넘치는 열만 int64 유지)
+        for column in ('viewCount', 'likeCount', 'commentCount'):
+            if df_videos[column].max() <= np.iinfo(np.uint32).max:
+                df_videos[column] = df_videos[column].astype(np.uint32)
+        
+        spread_coeff, avg_weighted, total_views, avg_views = self.calculate_spread_coefficient(df_videos)
         
-        top_videos = sorted(videos, key=lambda x: x['viewCount'], reverse=True)[:10]
-        top_titles = [video['title'] for video in top_videos]
+        top_videos = df_videos.nlargest(10, 'viewCount').reset_index(drop=True)
+        top_titles = top_videos['title'].tolist()
         common_keywords = self.extract_common_keywords(top_titles)
         
         result = {
             "keyword": keyword,
-            "total_videos": len(videos),
+            "total_videos": len(df_videos),
             "total_views": total_views,
             "avg_views": avg_views,
             "avg_weighted_views": avg_weighted,
@@ -210,16 +352,34 @@ class YouTubeSpreadAnalyzer:
             "days_back": days_back
         }
         
-        return result, videos
+        return result, df_videos
 
 # --- 2. Naver 분석 함수 ---
-def get_naver_search_index(keywords_dict, start_date, end_date):
-    url = "https://openapi.naver.com/v1/datalab/search"
-    headers = {
+NAVER_MAX_GROUPS = 5  # 데이터랩 요청 1회당 최대 키워드 그룹 수
+
+@st.cache_resource
+def _naver_headers():
+    """네이버 API 인증 헤더 (secrets는 프로세스당 한 번만 조회)"""
+    return {
         "X-Naver-Client-Id": st.secrets["NAVER_CLIENT_ID"],
         "X-Naver-Client-Secret": st.secrets["NAVER_CLIENT_SECRET"],
         "Content-Type": "application/json"
     }
+
+@st.cache_resource
+def _naver_session():
+    """네이버 API용 세션 (TCP/TLS 연결을 리런 간에 재사용)"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=API_MAX_WORKERS,
+        pool_maxsize=API_MAX_WORKERS * 2,
+        max_retries=Retry(total=3, backoff_factor=0.3)
+    ))
+    session.headers.update(_naver_headers())
+    return session
+
+def get_naver_search_index(session, keywords_dict, start_date, end_date):
+    url = "https://openapi.naver.com/v1/datalab/search"
     
     keyword_groups = []
     for group_name, keywords in keywords_dict.items():
@@ -235,20 +395,67 @@ def get_naver_search_index(keywords_dict, start_date, end_date):
         "keywordGroups": keyword_groups
     }
     
-    res = requests.post(url, json=body, headers=headers)
+    res = session.post(url, json=body, timeout=API_TIMEOUT)
     res.raise_for_status()
-    return res.json()
+    return orjson.loads(res.content)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_naver_trends(keyword, reference_keywords, start_date, end_date):
+    """기준 키워드를 요청당 그룹 수 제한에 맞춰 나눠 동시에 조회하고 결과를 합침"""
+    # 요청마다 최고값이 100으로 정규화되므로 모든 요청에 main을 넣어 척도를 맞춤
+    chunk_size = NAVER_MAX_GROUPS - 1
+    keywords_dicts = []
+    for chunk_start in range(0, max(len(reference_keywords), 1), chunk_size):
+        keywords_dict = {"main": [keyword]}
+        for i, ref_kw in enumerate(reference_keywords[chunk_start:chunk_start + chunk_size], chunk_start):
+            keywords_dict[f"ref_{i}"] = [ref_kw]
+        keywords_dicts.append(keywords_dict)
+    
+    # 세션(cache_resource, secrets 조회)은 스크립트 스레드에서 얻어 워커에 전달
+    session = _naver_session()
+    responses = list(_api_pool().map(
+        lambda keywords_dict: get_naver_search_index(session, keywords_dict, start_date, end_date),
+        keywords_dicts
+    ))
+    
+    results = []
+    base_main_sum = None
+    for response in responses:
+        groups = {res['title']: res for res in response['results']}
+        main_sum = sum(point['ratio'] for point in groups['main']['data'])
+        if base_main_sum is None:
+            base_main_sum = main_sum
+            results.append(groups['main'])
+        
+        # 첫 요청의 main 추이를 기준으로 나머지 요청의 비율을 환산
+        scale = base_main_sum / main_sum if main_sum else 1.0
+        for group_name, res in groups.items():
+            if group_name == 'main':
+                continue
+            for point in res['data']:
+                point['ratio'] *= scale
+            results.append(res)
+    
+    return {"results": results}
 
 def calculate_absolute_index(main_data, ref_data_list):
-    ref_max = 0
-    for ref_df in ref_data_list:
-        ref_max = max(ref_max, ref_df['ratio'].max())
+    ref_max = max((ref_df['ratio'].to_numpy().max() for ref_df in ref_data_list if not ref_df.empty), default=0.0)
+    if ref_max == 0:
+        return np.zeros(len(main_data))
     
-    return (main_data['ratio'] / ref_max) * 100
+    return (main_data['ratio'].to_numpy() / ref_max) * 100
 
 def calculate_bti(naver_abs_index):
     return naver_abs_index
 
+def calculate_moving_average(values, window=30):
+    """누적합으로 이동평균 계산 (데이터가 window개 미만인 앞쪽 구간은 있는 값만으로 평균)"""
+    values = np.asarray(values, dtype=np.float64)
+    cumsum = np.cumsum(np.insert(values, 0, 0.0))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumsum[ends] - cumsum[starts]) / (ends - starts)
+
 def calculate_combined_index(sc_value, bti_df):
     avg_bti = bti_df['bti'].tail(len(bti_df)).mean()
     combined_index = (sc_value * 10.0 + avg_bti) / 2.0
@@ -256,19 +463,28 @@ def calculate_combined_index(sc_value, bti_df):
 
 
 # --- 워드 클라우드 생성 함수 ---
-def create_wordcloud(text, font_path):
+@st.cache_resource
+def _wordcloud_pool():
+    """워드 클라우드를 스크립트 스레드 밖에서 생성하기 위한 스레드 풀 (프로세스당 하나)"""
+    return ThreadPoolExecutor(max_workers=2)
+
+def _build_wordcloud(text, font_path):
+    """워드 클라우드 이미지를 (H, W, 3) uint8 배열로 생성"""
     wordcloud = WordCloud(
         font_path=font_path,
         background_color="white",
         width=800,
         height=400,
-        max_words=50
+        max_words=50,
+        prefer_horizontal=1.0  # 세로 배치 시도를 생략해 레이아웃 계산 단축
     ).generate(text)
-    
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.imshow(wordcloud, interpolation="bilinear")
-    ax.axis("off")
-    st.pyplot(fig)
+    return wordcloud.to_array()
+
+def submit_wordcloud(text, font_path):
+    """워드 클라우드 생성을 백그라운드에서 시작하고 Future 반환 (텍스트가 없으면 None)"""
+    if not text:
+        return None
+    return _wordcloud_pool().submit(_build_wordcloud, text, font_path)
 
 # --- 사용자 인증 ---
 PASSWORD = st.secrets["APP_PASSWORD"]
@@ -289,9 +505,14 @@ if st.session_state.logged_in:
         
         st.subheader("네이버 BTI 기준 키워드")
         ref_keywords_str = st.text_input("콤마(,)로 구분하여 입력", "뉴스,날씨")
-        reference_keywords = [kw.strip() for kw in ref_keywords_str.split(',') if kw.strip()]
+        # 중복 제거 + 정렬된 튜플로 고정해 입력 순서/중복과 무관하게 같은 캐시 키 사용
+        reference_keywords = tuple(sorted({kw.strip() for kw in ref_keywords_str.split(',') if kw.strip()}))
         
         run_button = st.button("🚀 분석 시작")
+        
+        if st.button("🧹 캐시 비우기"):
+            st.cache_data.clear()
+            st.success("저장된 분석 결과를 비웠습니다.")
 
     if run_button and keyword:
         try:
@@ -300,8 +521,8 @@ if st.session_state.logged_in:
             with tab1:
                 st.header("📊 유튜브 확산 분석 결과")
                 with st.spinner("YouTube 데이터를 불러오는 중..."):
-                    youtube_analyzer = YouTubeSpreadAnalyzer(st.secrets["YOUTUBE_API_KEY"])
-                    result, videos = youtube_analyzer.analyze_keyword_spread(
+                    youtube_analyzer = YouTubeSpreadAnalyzer(_youtube_api_key())
+                    result, df_videos = youtube_analyzer.analyze_keyword_spread(
                         keyword,
                         days_back=days_back,
                         max_results=max_results
@@ -324,30 +545,32 @@ if st.session_state.logged_in:
                     
                     st.info(f"**총 조회수**: {result['total_videos']:,}회 | **평균 조회수**: {result['avg_views']:,.1f}회 | **평균 가중 조회수**: {result['avg_weighted_views']:,.1f}회")
 
+                    # 제목 워드 클라우드는 아래 결과를 표시하는 동안 미리 생성
+                    title_wc_future = submit_wordcloud(" ".join(df_videos['title']), font_path)
+                    
                     sc = result['spread_coefficient']
-                    sc_guide = ""
-                    if sc < 2.0: sc_guide = "미미한 영향"
-                    elif sc < 4.0: sc_guide = "주목 요망"
-                    elif sc < 6.0: sc_guide = "유의미한 영향"
-                    elif sc < 8.0: sc_guide = "심각한 영향"
-                    elif sc < 10.0: sc_guide = "위기 수준"
-                    else: sc_guide = "최고 위기 수준"
+                    sc_guide = _SC_LABELS[int(np.searchsorted(_SC_BOUNDS, sc, side='right'))]
                     st.markdown(f"**해석**: {sc_guide}")
                     
                     # 상위 10개 동영상
                     st.subheader("상위 10개 동영상")
-                    top_videos_df = pd.DataFrame(result['top_videos'])
-                    top_videos_df['publishedAt'] = pd.to_datetime(top_videos_df['publishedAt']).dt.strftime('%Y-%m-%d')
-                    top_videos_df = top_videos_df[['channelTitle', 'title', 'viewCount', 'likeCount', 'commentCount', 'publishedAt']]
+                    top_videos_df = result['top_videos'][['channelTitle', 'title', 'viewCount', 'likeCount', 'commentCount', 'publishedAt']]
+                    # publishedAt은 항상 'YYYY-MM-DDTHH:MM:SSZ' 형식이므로 날짜 부분만 잘라서 표시
+                    top_videos_df = top_videos_df.assign(publishedAt=top_videos_df['publishedAt'].str[:10])
                     st.dataframe(top_videos_df, use_container_width=True)
 
                     st.subheader("👍 좋아요 순 최상위 댓글")
                     st.info("조회수 상위 10개 영상의 댓글을 가져와 좋아요 순으로 정렬한 결과입니다.")
-                    top_video_ids = [v['id'] for v in result['top_videos']]
+                    top_video_ids = result['top_videos']['id'].tolist()
                     all_comments_list = youtube_analyzer.get_video_comments_with_likes(top_video_ids)
+                    
+                    # 댓글 워드 클라우드도 댓글 목록을 표시하는 동안 미리 생성
+                    # (텍스트만 추출하여 공백으로 연결하고, 줄바꿈 태그 제거)
+                    all_comments_text_for_wc = " ".join([comment['text'] for comment in all_comments_list])
+                    comment_wc_future = submit_wordcloud(re.sub(r'<br\s*/>', ' ', all_comments_text_for_wc), font_path)
 
                     if all_comments_list:
-                        top_comments_sorted = sorted(all_comments_list, key=lambda x: x['likeCount'], reverse=True)[:30]
+                        top_comments_sorted = nlargest(30, all_comments_list, key=itemgetter('likeCount'))
                         for i, comment_data in enumerate(top_comments_sorted):
                             st.markdown(f"**{i+1}.** {comment_data['text']}")
                             st.caption(f"좋아요 수: {comment_data['likeCount']:,}개")
@@ -359,45 +582,38 @@ if st.session_state.logged_in:
                     
                     with wordcloud_tab1:
                         st.subheader("💬 영상 제목 워드 클라우드")
-                        all_titles_text = " ".join([video['title'] for video in videos])
-                        if all_titles_text:
-                            create_wordcloud(all_titles_text, font_path)
+                        if title_wc_future:
+                            st.image(title_wc_future.result(), width="stretch")
                         else:
                             st.info("워드 클라우드를 생성할 제목이 없습니다.")
                     
                     with wordcloud_tab2:
                         st.subheader("🗣️ 영상 댓글 워드 클라우드")
                         st.info("워드 클라우드는 좋아요 순으로 정렬된 댓글들을 기반으로 생성되었습니다.")
-                        if all_comments_list:
-                            # 텍스트만 추출하여 공백으로 연결
-                            all_comments_text_for_wc = " ".join([comment['text'] for comment in all_comments_list])
-                            if all_comments_text_for_wc:
-                                # 워드 클라우드 생성 시에만 줄바꿈 태그를 제거
-                                cleaned_text = re.sub(r'<br\s*/>', ' ', all_comments_text_for_wc)
-                                create_wordcloud(cleaned_text, font_path)
-                            else:
-                                st.info("워드 클라우드를 생성할 댓글이 없습니다.")
+                        if comment_wc_future:
+                            st.image(comment_wc_future.result(), width="stretch")
                         else:
                             st.info("워드 클라우드를 생성할 댓글이 없습니다.")
 
             with tab2:
                 st.header("📈 네이버 BTI 분석 결과")
                 with st.spinner("Naver 데이터를 불러오는 중..."):
-                    end_date = datetime.now().strftime("%Y-%m-%d")
-                    start_date = (datetime.now() - timedelta(days=days_back)).strftime("%Y-%m-%d")
-                    
-                    keywords_dict = {"main": [keyword]}
-                    for i, ref_kw in enumerate(reference_keywords):
-                        keywords_dict[f"ref_{i}"] = [ref_kw]
+                    now = datetime.now()
+                    end_date = now.strftime("%Y-%m-%d")
+                    start_date = (now - timedelta(days=days_back)).strftime("%Y-%m-%d")
                     
                     try:
-                        naver_raw = get_naver_search_index(keywords_dict, start_date, end_date)
+                        naver_raw = get_naver_trends(keyword, reference_keywords, start_date, end_date)
                         
                         results = {}
                         for res in naver_raw['results']:
                             group_name = res['title']
-                            df = pd.DataFrame(res['data'])
-                            df['date'] = pd.to_datetime(df['period'])
+                            data = res['data']
+                            # period는 'YYYY-MM-DD' 형식이므로 문자열 파싱 없이 바로 datetime64로 변환
+                            df = pd.DataFrame({
+                                'date': np.array([point['period'] for point in data], dtype='datetime64[D]'),
+                                'ratio': np.fromiter((point['ratio'] for point in data), dtype=np.float64, count=len(data))
+                            })
                             results[group_name] = df
                         
                         main_df = results['main']
@@ -405,6 +621,7 @@ if st.session_state.logged_in:
                         
                         main_df['abs_index'] = calculate_absolute_index(main_df, ref_dfs)
                         main_df['bti'] = calculate_bti(main_df['abs_index'])
+                        main_df['30d_ma'] = calculate_moving_average(main_df['bti'].to_numpy(), window=30)
                         
                         st.subheader(f"'{keyword}' 키워드 BTI 분석 (최근 {days_back}일 기준)")
                         st.metric(f"최근 {days_back}일 평균 BTI", f"{main_df['bti'].tail(days_back).mean():.2f}")
@@ -421,11 +638,11 @@ if st.session_state.logged_in:
 
                         st.subheader("BTI 지수 추이 그래프")
                         
-                        fig, ax = plt.subplots(figsize=(12, 6))
-                        ax.plot(main_df['date'], main_df['bti'], 'b-', linewidth=2, label='BTI 지수')
-                        
-                        plt.tight_layout()
-                        st.pyplot(fig)
+                        # 브라우저(Vega-Lite)에서 렌더링되는 네이티브 차트 사용
+                        bti_chart_df = main_df.set_index('date')[['bti', '30d_ma']].rename(
+                            columns={'bti': 'BTI 지수', '30d_ma': '30일 이동평균'}
+                        )
+                        st.line_chart(bti_chart_df)
                         
                         combined_index = calculate_combined_index(result['spread_coefficient'], main_df)
                         st.subheader("🔮 통합 확산 잠재력 지수")